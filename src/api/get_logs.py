@@ -3,10 +3,11 @@ import os
 import json
 from typing import Optional, List, Dict, Any
 import sys
+from contextlib import asynccontextmanager
 
 # Framework FastAPI
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request, Depends
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # --- VERCEL PATH FIX (STILL REQUIRED) ---
@@ -19,18 +20,40 @@ sys.path.append(
 )
 # --- FIM DA MODIFICAÇÃO ---
 
-# --- INÍCIO DA MODIFICAÇÃO PRISMA ---
-from lib.prisma_client import Prisma # REMOVED 'register'
-# --- FIM DA MODIFICAÇÃO PRISMA ---
+# --- INÍCIO DA MODIFICAÇÃO ASYNCPG ---
+# O polling de logs é uma query simples e quente: vai direto no Postgres,
+# sem passar pelo query engine do Prisma.
+import asyncpg
+# Pool asyncpg a partir da DATABASE_URL do Prisma (compartilhado com ingest.py)
+from lib.pg_pool import create_pg_pool
+# --- FIM DA MODIFICAÇÃO ASYNCPG ---
 
 
+# ==============================================================================
+#  Ciclo de vida do DB (um único pool asyncpg por processo)
+# ==============================================================================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Cria o pool de conexões uma vez no startup e reaproveita em todas as requests."""
+    app.state.pool = await create_pg_pool()
+    try:
+        yield
+    finally:
+        await app.state.pool.close()
+
+def get_pool(request: Request) -> asyncpg.Pool:
+    """Dependency que retorna o pool compartilhado do app."""
+    return request.app.state.pool
+
 # ==============================================================================
 #  Inicialização do App FastAPI
 # ==============================================================================
 app = FastAPI(
     title="Log API",
     description="Busca os logs de ingestão.",
-    docs_url="/docs" # /api/get_logs/docs
+    docs_url="/docs", # /api/get_logs/docs
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -42,37 +65,48 @@ app.add_middleware(
 )
 
 # ==============================================================================
-#  Endpoint da API FastAPI (Refatorado para PRISMA)
+#  Endpoint da API FastAPI (asyncpg)
 # ==============================================================================
 
 # REMOVED: register(app) - This line was causing the error
 
 @app.get("/")
-async def handle_get_logs(job_id: Optional[str] = Query(None)):
+async def handle_get_logs(
+    job_id: Optional[str] = Query(None),
+    after_id: Optional[int] = Query(None),
+    limit: int = Query(500, ge=1, le=5000),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
     """
     Lida com a busca de logs por job_id.
+    Paginado por cursor: o frontend devolve o 'last_id' recebido em 'after_id'
+    e recebe apenas os logs novos desde o último poll.
     """
     if not job_id:
         raise HTTPException(status_code=400, detail="job_id é obrigatório.")
         
-    db = Prisma()
-    
     try:
-        await db.connect()
-        log_entries = await db.ingestionlogs.find_many(
-            where={'job_id': job_id},
-            order={'timestamp': 'asc'}
-        )
+        async with pool.acquire() as con:
+            rows = await con.fetch(
+                "SELECT id, log_type, message FROM ingestion_logs "
+                "WHERE job_id = $1 AND id > $2 ORDER BY id LIMIT $3",
+                job_id,
+                after_id or 0,
+                limit
+            )
         
-        # Formata a saída para corresponder ao que o frontend espera
-        logs_formatted = [
-            {"type": log.log_type, "text": log.message}
-            for log in log_entries
-        ]
+        # Cada log vai como o par [type, text]: sem um dict por linha e sem
+        # repetir as chaves no JSON. O frontend remonta os objetos.
+        logs_formatted = [(row[1], row[2]) for row in rows]
         
-        return JSONResponse(
+        # ORJSONResponse serializa direto com orjson, sem o jsonable_encoder/json.dumps
+        return ORJSONResponse(
             status_code=200,
-            content={'status': 'success', 'logs': logs_formatted}
+            content={
+                'status': 'success',
+                'logs': logs_formatted,
+                'last_id': rows[-1]["id"] if rows else after_id
+            }
         )
         
     except Exception as e:
@@ -81,7 +115,4 @@ async def handle_get_logs(job_id: Optional[str] = Query(None)):
         raise HTTPException(
             status_code=500,
             detail={'status': 'error', 'message': error_message}
-        )
-    finally:
-        if db.is_connected():
-            await db.disconnect()
\ No newline at end of file
+        )
\ No newline at end of file
@@ -2,14 +2,19 @@
 import os
 import json
 import uuid
-import tempfile
+import functools
 from datetime import datetime
-from typing import cast, IO, Any, Optional, List, Dict
+from decimal import Decimal
+from typing import cast, IO, Any, Optional, List, Dict, Iterator
 import sys
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import redis.asyncio as aioredis
 
 # Framework FastAPI
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Request, Depends
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # --- VERCEL PATH FIX (STILL REQUIRED) ---
@@ -22,23 +27,57 @@ sys.path.append(
 )
 # --- FIM DA MODIFICAÇÃO ---
 
-# --- INÍCIO DA MODIFICAÇÃO PRISMA ---
-# Import the generated Prisma client
-from lib.prisma_client import Prisma, models # REMOVED 'register'
-from pydantic import BaseModel
+# --- INÍCIO DA MODIFICAÇÃO ASYNCPG ---
+# Logs e inserção de transações são queries simples e quentes: vão direto
+# no Postgres pelo asyncpg, sem passar pelo query engine do Prisma.
+import asyncpg
+# Pool asyncpg a partir da DATABASE_URL do Prisma (compartilhado com get_logs.py)
+from lib.pg_pool import create_pg_pool
 
 # Our parser library (no changes)
-from lib.parsers.bank_parser import parse_2024, parse_2025
-# --- FIM DA MODIFICAÇÃO PRISMA ---
+from lib.parsers.bank_parser import iter_2024, iter_2025
+from lib.parsers.page_pool import create_page_pool, shutdown_page_pool
+# Cache do DRE (compartilhado com reports/monthly_dre.py)
+from lib.dre_cache import create_redis, get_redis, invalidate_dre_cache
+# Gravação do upload em /tmp (compartilhada entre as ingestões)
+from lib.uploads import save_upload_to_tmp
+# --- FIM DA MODIFICAÇÃO ASYNCPG ---
 
 
+# ==============================================================================
+#  Ciclo de vida do DB (um único pool asyncpg por processo)
+# ==============================================================================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Cria o pool de conexões uma vez no startup e reaproveita em todas as requests."""
+    app.state.pool = await create_pg_pool()
+    app.state.redis = create_redis()
+    app.state.page_pool = create_page_pool()
+    try:
+        yield
+    finally:
+        shutdown_page_pool(app.state.page_pool)
+        if app.state.redis is not None:
+            await app.state.redis.aclose()
+        await app.state.pool.close()
+
+def get_pool(request: Request) -> asyncpg.Pool:
+    """Dependency que retorna o pool compartilhado do app."""
+    return request.app.state.pool
+
+def get_page_pool(request: Request) -> Optional[Executor]:
+    """Dependency que retorna o pool de processos dos parsers (None sem multiprocessing)."""
+    return request.app.state.page_pool
+
 # ==============================================================================
 #  Inicialização do App FastAPI
 # ==============================================================================
 app = FastAPI(
     title="Ingestion API",
     description="Lida com o parsing e ingestão de extratos bancários.",
-    docs_url="/docs" 
+    docs_url="/docs",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -50,102 +89,175 @@ app.add_middleware(
 )
 
 # ==============================================================================
-#  Gerenciamento do DB (Refatorado para PRISMA)
+#  Gerenciamento do DB (asyncpg)
 # ==============================================================================
-# Pydantic model for type-hinting the create_many data
-class TransactionCreateInput(BaseModel):
-    transaction_date: Optional[datetime]
-    posting_date: Optional[datetime]
-    type: str
-    amount_decimal: float
-    raw_history_text: str
-    raw_value_text: Optional[str]
-    raw_balance_text: Optional[str]
-    source_file_name: str
-    raw_json_data: Optional[Dict[str, Any]]
+_INSERT_LOG_SQL = (
+    "INSERT INTO ingestion_logs (job_id, log_type, message) "
+    "VALUES ($1, $2, $3)"
+)
+
+# Tipos de log que forçam o flush imediato do buffer, para que o frontend
+# acompanhe os marcos do job (e os erros) sem esperar o fim da task.
+_FLUSH_LOG_TYPES = ("server", "error")
+
+# Ordem das colunas usada no COPY de bank_transactions
+_TRANSACTION_COLUMNS = [
+    "transaction_date",
+    "posting_date",
+    "type",
+    "amount_decimal",
+    "raw_history_text",
+    "raw_value_text",
+    "raw_balance_text",
+    "source_file_name",
+    "raw_json_data"
+]
+
+# Extratos repetem muito as mesmas datas (várias transações no mesmo dia),
+# então cada string 'dd/mm/YYYY' é parseada uma única vez.
+@functools.lru_cache(maxsize=4096)
+def _to_date_obj(date_str: str) -> Optional[datetime]:
+    """Converte 'dd/mm/YYYY' para um objeto datetime.datetime."""
+    if not date_str: return None
+    try:
+        # Formato fixo: split manual é bem mais rápido que strptime.
+        # Retorna o objeto datetime, o asyncpg cuida da codificação
+        day, month, year = date_str.split('/')
+        return datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None
 
 class DatabaseManager:
     """Gerencia a conexão com o banco de dados e as operações de logging/inserção."""
     
-    def __init__(self, job_id: str, db_client: Prisma):
+    def __init__(self, job_id: str, pool: asyncpg.Pool):
         self.job_id = job_id
-        self.db = db_client # Use the passed client
+        self.pool = pool # Use the shared pool
+        self._buffer: List[tuple] = [] # Logs pendentes de gravação
 
     async def log(self, log_type: str, message: str):
-        """Grava um log no console e no DB (agora assíncrono)."""
+        """Grava um log no console e o acumula no buffer do job."""
         print(f"LOG [job: {self.job_id}] ({log_type}): {message}")
+        # O timestamp fica com o default now() do DB, como nos demais logs;
+        # a ordem dos logs vem do id
+        self._buffer.append((self.job_id, log_type, message))
+        if log_type in _FLUSH_LOG_TYPES:
+            await self.flush()
+
+    async def flush(self):
+        """Grava todos os logs do buffer no DB em um único round-trip."""
+        if not self._buffer: return
+        rows, self._buffer = self._buffer, []
         try:
-            await self.db.ingestionlogs.create(
-                data={
-                    'job_id': self.job_id,
-                    'log_type': log_type,
-                    'message': message
-                }
-            )
+            await self.pool.executemany(_INSERT_LOG_SQL, rows)
         except Exception as e:
-            print(f"Erro ao gravar log no DB: {e}")
+            print(f"Erro ao gravar logs no DB: {e}")
 
-    def _format_date_for_prisma(self, date_str: str) -> Optional[datetime]:
-        """Converte 'dd/mm/YYYY' para um objeto datetime.datetime."""
-        if not date_str: return None
-        try:
-            # Retorna o objeto datetime, o Prisma cuida da formatação
-            return datetime.strptime(date_str, '%d/%m/%Y')
-        except ValueError:
-            return None
+    def _transaction_records(self, transactions: List[Dict[str, Any]]) -> Iterator[tuple]:
+        """Gera as tuplas do COPY direto dos dicts do parser, na ordem de _TRANSACTION_COLUMNS."""
+        for t in transactions:
+            raw_json_data = t["raw_json_data"]
+            yield (
+                _to_date_obj(t["transaction_date"]),
+                _to_date_obj(t["posting_date"]),
+                t["type"],
+                Decimal(str(t["amount"])),
+                t["raw_history_text"],
+                t["raw_value_text"],
+                t["raw_balance_text"],
+                t["source_file_name"],
+                json.dumps(raw_json_data) if raw_json_data is not None else None
+            )
 
-    async def insert_transactions(self, transactions: List[Dict[str, Any]]) -> int:
-        if not transactions: return 0
-        
-        rows_to_insert = [
-            TransactionCreateInput(
-                transaction_date=self._format_date_for_prisma(t["transaction_date"]),
-                posting_date=self._format_date_for_prisma(t["posting_date"]),
-                type=t["type"],
-                amount_decimal=t["amount"],
-                raw_history_text=t["raw_history_text"],
-                raw_value_text=t["raw_value_text"],
-                raw_balance_text=t["raw_balance_text"],
-                source_file_name=t["source_file_name"],
-                raw_json_data=t["raw_json_data"]
-            ) for t in transactions
-        ]
-        
-        # Converte os modelos Pydantic em dicts para o create_many
-        data_to_create = [row.model_dump() for row in rows_to_insert]
-        
-        result = await self.db.banktransactions.create_many(
-            data=data_to_create # type: ignore
-        )
-        return result
+    async def insert_transaction_stream(self, queue: "asyncio.Queue[Any]") -> int:
+        """
+        Consome blocos de transações da fila e grava cada um via COPY assim que chega.
+        Tudo roda em uma única transação: se o produtor falhar, nada é gravado.
+        """
+        rows_inserted = 0
+        async with self.pool.acquire() as con:
+            async with con.transaction():
+                while (chunk := await queue.get()) is not None:
+                    if isinstance(chunk, Exception):
+                        raise chunk
+                    # COPY ... FROM STDIN (binário): um único round-trip, sem parse/bind por linha
+                    status = await con.copy_records_to_table(
+                        "bank_transactions",
+                        records=self._transaction_records(chunk),
+                        columns=_TRANSACTION_COLUMNS
+                    )
+                    # status tem o formato 'COPY <n>'
+                    rows_inserted += int(status.split()[-1])
+        return rows_inserted
 
 # ==============================================================================
 #  Lógica de Background Task (Atualizada para async/await)
 # ==============================================================================
-async def process_file_task(job_id: str, file_path: str, filename: str):
+# Blocos parseados aguardando inserção; limita a memória se o DB ficar para trás
+_PIPELINE_QUEUE_SIZE = 4
+
+async def produce_transaction_chunks(
+    queue: "asyncio.Queue[Any]",
+    chunks: Iterator[List[Dict[str, Any]]],
+    parse_thread: Executor
+):
+    """
+    Avança o parser (síncrono) na thread do job, bloco a bloco, e publica cada bloco na fila.
+    Termina com None; em caso de erro publica a exceção para o consumidor.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        while (chunk := await loop.run_in_executor(parse_thread, next, chunks, None)) is not None:
+            await queue.put(chunk)
+    except Exception as e:
+        await queue.put(e)
+        return
+    await queue.put(None)
+
+async def process_file_task(
+    pool: asyncpg.Pool,
+    page_pool: Optional[Executor],
+    redis: Optional[aioredis.Redis],
+    job_id: str,
+    file_path: str,
+    filename: str
+):
     """Esta função roda em background para que a API possa retornar o job_id imediatamente."""
     
-    # Conecta ao DB
-    db_client = Prisma()
-    await db_client.connect()
-    db = DatabaseManager(job_id, db_client)
+    # Usa o pool compartilhado do app (criado no lifespan)
+    db = DatabaseManager(job_id, pool)
     
     try:
+        await db.log("info", "Job de ingestão iniciado.")
         await db.log("info", f"Arquivo recebido: {filename}")
         await db.log("info", f"Arquivo salvo temporariamente em: {file_path}")
 
         if filename.startswith('ComprovanteBB'):
             await db.log("info", "Usando parser 2025 (Regex)...")
-            transactions = parse_2025(file_path, filename)
+            chunks = iter_2025(file_path, filename, executor=page_pool)
         else:
             await db.log("info", "Usando parser 2024 (Tabela)...")
-            transactions = parse_2024(file_path, filename)
-        
-        await db.log("server", f"Parsing concluído. {len(transactions)} transações encontradas.")
+            chunks = iter_2024(file_path, filename, executor=page_pool)
 
-        if transactions:
-            await db.log("server", "Iniciando inserção no PostgreSQL...")
-            rows_inserted = await db.insert_transactions(transactions)
+        await db.log("server", "Iniciando parsing e inserção no PostgreSQL...")
+
+        # Pipeline: o bloco N é gravado enquanto o bloco N+1 é parseado.
+        # Uma thread só para o parser: next() e close() do gerador nunca rodam juntos.
+        loop = asyncio.get_running_loop()
+        parse_thread = ThreadPoolExecutor(max_workers=1)
+        queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=_PIPELINE_QUEUE_SIZE)
+        producer = asyncio.create_task(produce_transaction_chunks(queue, chunks, parse_thread))
+        try:
+            rows_inserted = await db.insert_transaction_stream(queue)
+        finally:
+            producer.cancel()
+            # O cancel() não interrompe um next() já em andamento na thread; o close()
+            # entra na fila logo depois dele e fecha o parser (PDF e blocos pendentes).
+            await loop.run_in_executor(parse_thread, chunks.close)
+            parse_thread.shutdown(wait=False)
+
+        if rows_inserted:
+            await invalidate_dre_cache(redis)
             await db.log("success", f"Inserção concluída. {rows_inserted} linhas adicionadas.")
         else:
             await db.log("info", "Nenhuma transação encontrada para inserir.")
@@ -157,9 +269,9 @@ async def process_file_task(job_id: str, file_path: str, filename: str):
         print(f"--- ERRO CRÍTICO: {error_message} ---")
         await db.log("error", error_message)
     finally:
+        await db.flush()
         if os.path.exists(file_path):
             os.remove(file_path)
-        await db_client.disconnect()
 
 # ==============================================================================
 #  Endpoint da API FastAPI (Atualizado para async/await)
@@ -168,38 +280,27 @@ async def process_file_task(job_id: str, file_path: str, filename: str):
 # REMOVED: register(app) - This line was causing the error
 
 @app.post("/")
-async def handle_ingest(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def handle_ingest(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    pool: asyncpg.Pool = Depends(get_pool),
+    page_pool: Optional[Executor] = Depends(get_page_pool),
+    redis: Optional[aioredis.Redis] = Depends(get_redis)
+):
     """
     Lida com o upload do arquivo, inicia o job em background e retorna um job_id.
     """
     job_id = str(uuid.uuid4())
     
-    # Log inicial (não-assíncrono) para criar o job o mais rápido possível
-    # A task de background usará um gerenciador de DB completo
-    db_client = Prisma()
+    # O log inicial do job é gravado pela task de background (no buffer),
+    # assim a resposta sai logo após salvar o arquivo, sem ir ao DB.
     try:
-        await db_client.connect()
-        await db_client.ingestionlogs.create(
-            data={
-                'job_id': job_id,
-                'log_type': 'info',
-                'message': 'Job de ingestão iniciado.'
-            }
-        )
-    except Exception as e:
-         print(f"Erro no log inicial: {e}")
-    finally:
-        await db_client.disconnect() # Desconecta após o log inicial
-    
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, dir="/tmp", suffix=file.filename) as temp_file:
-            temp_file.write(await file.read())
-            temp_file_path = temp_file.name
+        temp_file_path = await save_upload_to_tmp(file)
         
         # Adiciona a task async
-        background_tasks.add_task(process_file_task, job_id, temp_file_path, file.filename or "unknown_file")
+        background_tasks.add_task(process_file_task, pool, page_pool, redis, job_id, temp_file_path, file.filename or "unknown_file")
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=200,
             content={'job_id': job_id, 'status': 'processing_started'}
         )
@@ -209,18 +310,9 @@ async def handle_ingest(background_tasks: BackgroundTasks, file: UploadFile = Fi
         print(f"--- ERRO CRÍTICO (Ingest): {error_message} ---")
         # Log de erro
         try:
-            await db_client.connect()
-            await db_client.ingestionlogs.create(
-                data={
-                    'job_id': job_id,
-                    'log_type': 'error',
-                    'message': error_message
-                }
-            )
+            await pool.execute(_INSERT_LOG_SQL, job_id, 'error', error_message)
         except Exception as e_log:
             print(f"Erro ao logar erro: {e_log}")
-        finally:
-            await db_client.disconnect()
 
         raise HTTPException(
             status_code=500,
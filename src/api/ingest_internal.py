@@ -2,14 +2,16 @@
 import os
 import json
 import uuid
-import tempfile
-from datetime import datetime
 from typing import cast, IO, Any, Optional, List, Dict
 import sys
+import asyncio
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+import redis.asyncio as aioredis
 
 # Framework FastAPI
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Request, Depends
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # --- VERCEL PATH FIX (STILL REQUIRED) ---
@@ -25,14 +27,46 @@ sys.path.append(
 # --- INÍCIO DA MODIFICAÇÃO PRISMA ---
 # Import the generated Prisma client
 from lib.prisma_client import Prisma # REMOVED 'register'
-from lib.prisma_client.models import InternalPayments, InternalReceivables
 # --- FIM DA MODIFICAÇÃO PRISMA ---
 
 # --- INÍCIO DA MODIFICAÇÃO PARSER ---
 # Import our new internal parser
 from lib.parsers.internal_parser import parse_pagamentos, parse_recebimentos
+from lib.parsers.page_pool import create_page_pool, shutdown_page_pool
 # --- FIM DA MODIFICAÇÃO PARSER ---
 
+# Cache do DRE (compartilhado com reports/monthly_dre.py)
+from lib.dre_cache import create_redis, get_redis, invalidate_dre_cache
+# Gravação do upload em /tmp (compartilhada entre as ingestões)
+from lib.uploads import save_upload_to_tmp
+
+
+# ==============================================================================
+#  Ciclo de vida do DB (um único client Prisma por processo)
+# ==============================================================================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Conecta o Prisma uma vez no startup e reaproveita em todas as requests."""
+    db = Prisma()
+    await db.connect()
+    app.state.db = db
+    app.state.page_pool = create_page_pool()
+    app.state.redis = create_redis()
+    try:
+        yield
+    finally:
+        if app.state.redis is not None:
+            await app.state.redis.aclose()
+        shutdown_page_pool(app.state.page_pool)
+        await db.disconnect()
+
+def get_db(request: Request) -> Prisma:
+    """Dependency que retorna o client compartilhado do app."""
+    return request.app.state.db
+
+def get_page_pool(request: Request) -> Optional[Executor]:
+    """Dependency que retorna o pool de processos dos parsers (None sem multiprocessing)."""
+    return request.app.state.page_pool
 
 # ==============================================================================
 #  Inicialização do App FastAPI
@@ -40,7 +74,9 @@ from lib.parsers.internal_parser import parse_pagamentos, parse_recebimentos
 app = FastAPI(
     title="Internal Ingestion API",
     description="Lida com o parsing e ingestão de relatórios internos (pagamentos/recebimentos).",
-    docs_url="/docs" 
+    docs_url="/docs",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -54,54 +90,82 @@ app.add_middleware(
 # ==============================================================================
 #  Lógica de Background Task
 # ==============================================================================
-async def process_file_task(job_id: str, file_path: str, filename: str):
+async def process_file_task(
+    db: Prisma,
+    page_pool: Optional[Executor],
+    redis: Optional[aioredis.Redis],
+    job_id: str,
+    file_path: str,
+    filename: str
+):
     """Esta função roda em background para ingerir os relatórios internos."""
     
-    db = Prisma()
-    await db.connect()
-    
-    # Helper async para logar no DB
-    async def db_log(log_type: str, message: str):
-        print(f"LOG [job: {job_id}] ({log_type}): {message}")
+    # Logs pendentes de gravação; gravados em lote por flush_logs()
+    log_buffer: List[Dict[str, Any]] = []
+
+    async def flush_logs():
+        if not log_buffer:
+            return
+        data = log_buffer.copy()
+        log_buffer.clear()
         try:
-            await db.ingestionlogs.create(
-                data={'job_id': job_id, 'log_type': log_type, 'message': message}
-            )
+            await db.ingestionlogs.create_many(data=data) # type: ignore
         except Exception as e:
-            print(f"Erro ao gravar log no DB: {e}")
+            print(f"Erro ao gravar logs no DB: {e}")
+
+    # Helper async para logar no DB (acumula no buffer; 'server'/'error' gravam na hora).
+    # O timestamp fica com o default do schema, como no log de erro do handler.
+    async def db_log(log_type: str, message: str):
+        print(f"LOG [job: {job_id}] ({log_type}): {message}")
+        log_buffer.append({
+            'job_id': job_id,
+            'log_type': log_type,
+            'message': message
+        })
+        if log_type in ("server", "error"):
+            await flush_logs()
+
+    # O parser roda numa thread do executor padrão, só para liberar o event loop;
+    # o trabalho pesado (os blocos de páginas) vai para o page_pool.
+    loop = asyncio.get_running_loop()
 
     try:
+        await db_log("info", "Job de ingestão interna iniciado.")
         await db_log("info", f"Arquivo interno recebido: {filename}")
         
         # Determina qual parser usar
         if "pagamentos" in filename.lower():
             await db_log("info", "Usando parser de Pagamentos...")
-            parsed_data = parse_pagamentos(file_path, filename)
+            parsed_data, _ = await asyncio.gather(
+                loop.run_in_executor(None, parse_pagamentos, file_path, filename, page_pool),
+                flush_logs()
+            )
             
             if parsed_data:
-                # Converte os dicts em Pydantic models para o create_many
-                data_to_create = [InternalPayments(**d).model_dump() for d in parsed_data]
-                
-                await db_log("server", f"Iniciando inserção de {len(data_to_create)} pagamentos...")
+                # Os dicts do parser já têm as chaves do create_many; sem round-trip Pydantic
+                await db_log("server", f"Iniciando inserção de {len(parsed_data)} pagamentos...")
                 result = await db.internalpayments.create_many(
-                    data=data_to_create # type: ignore
+                    data=parsed_data # type: ignore
                 )
+                await invalidate_dre_cache(redis)
                 await db_log("success", f"Inserção concluída. {result} pagamentos adicionados.")
             else:
                 await db_log("info", "Nenhum dado de pagamento encontrado.")
 
         elif "recebimentos" in filename.lower():
             await db_log("info", "Usando parser de Recebimentos...")
-            parsed_data = parse_recebimentos(file_path, filename)
+            parsed_data, _ = await asyncio.gather(
+                loop.run_in_executor(None, parse_recebimentos, file_path, filename, page_pool),
+                flush_logs()
+            )
             
             if parsed_data:
-                # Converte os dicts em Pydantic models para o create_many
-                data_to_create = [InternalReceivables(**d).model_dump() for d in parsed_data]
-
-                await db_log("server", f"Iniciando inserção de {len(data_to_create)} recebimentos...")
+                # Os dicts do parser já têm as chaves do create_many; sem round-trip Pydantic
+                await db_log("server", f"Iniciando inserção de {len(parsed_data)} recebimentos...")
                 result = await db.internalreceivables.create_many(
-                    data=data_to_create # type: ignore
+                    data=parsed_data # type: ignore
                 )
+                await invalidate_dre_cache(redis)
                 await db_log("success", f"Inserção concluída. {result} recebimentos adicionados.")
             else:
                 await db_log("info", "Nenhum dado de recebimento encontrado.")
@@ -116,10 +180,9 @@ async def process_file_task(job_id: str, file_path: str, filename: str):
         print(f"--- ERRO CRÍTICO (Internal Ingest): {error_message} ---")
         await db_log("error", error_message)
     finally:
+        await flush_logs()
         if os.path.exists(file_path):
             os.remove(file_path)
-        if db.is_connected():
-            await db.disconnect()
 
 # ==============================================================================
 #  Endpoint da API FastAPI
@@ -128,31 +191,26 @@ async def process_file_task(job_id: str, file_path: str, filename: str):
 # REMOVED: register(app) - This line was causing the error
 
 @app.post("/")
-async def handle_internal_ingest(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def handle_internal_ingest(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: Prisma = Depends(get_db),
+    page_pool: Optional[Executor] = Depends(get_page_pool),
+    redis: Optional[aioredis.Redis] = Depends(get_redis)
+):
     """
     Lida com o upload do relatório, inicia o job em background e retorna um job_id.
     """
     job_id = str(uuid.uuid4())
-    db = Prisma()
     
     try:
-        # Log inicial rápido
-        await db.connect()
-        await db.ingestionlogs.create(
-            data={
-                'job_id': job_id,
-                'log_type': 'info',
-                'message': 'Job de ingestão interna iniciado.'
-            }
-        )
-        
-        with tempfile.NamedTemporaryFile(delete=False, dir="/tmp", suffix=file.filename) as temp_file:
-            temp_file.write(await file.read())
-            temp_file_path = temp_file.name
+        # O log inicial do job é gravado pela task de background,
+        # assim a resposta sai logo após salvar o arquivo, sem ir ao DB.
+        temp_file_path = await save_upload_to_tmp(file)
         
-        background_tasks.add_task(process_file_task, job_id, temp_file_path, file.filename or "unknown_file")
+        background_tasks.add_task(process_file_task, db, page_pool, redis, job_id, temp_file_path, file.filename or "unknown_file")
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=200,
             content={'job_id': job_id, 'status': 'processing_started'}
         )
@@ -170,7 +228,4 @@ async def handle_internal_ingest(background_tasks: BackgroundTasks, file: Upload
         raise HTTPException(
             status_code=500,
             detail={'job_id': job_id, 'status': 'error', 'message': error_message}
-        )
-    finally:
-        if db.is_connected():
-            await db.disconnect()
\ No newline at end of file
+        )
\ No newline at end of file
@@ -1,11 +1,18 @@
 import os
 import sys
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-# --- FIX: Import datetime and time ---
-from datetime import date, datetime, time
-import json
+import asyncio
+import logging
+import logging.handlers
+import queue
+from contextlib import asynccontextmanager
+import calendar
+from datetime import date
+from decimal import Decimal
+from typing import Optional, List, Dict, Any, Tuple
+from fastapi import FastAPI, HTTPException, Query, Request, Depends
+from fastapi.responses import ORJSONResponse, Response
+import orjson
+import redis.asyncio as aioredis
 
 # --- VERCEL PATH FIX (STILL REQUIRED) ---
 sys.path.append(
@@ -20,12 +27,47 @@ sys.path.append(
 # --- FIM DA MODIFICAÇÃO ---
 
 from lib.prisma_client import Prisma
-# --- FIX: IMPORT PRISMA TYPES ---
-from lib.prisma_client.types import (
-    BankTransactionsWhereInput, 
-    InternalReceivablesWhereInput, 
-    DateTimeFilter
-)
+# Cache do DRE (a mesma chave de versão que as ingestões incrementam)
+from lib.dre_cache import create_redis, get_redis, get_dre_cache_key, dre_cache_ttl
+
+# ==============================================================================
+#  Logging (a escrita em stderr sai do event loop)
+# ==============================================================================
+logger = logging.getLogger("dre")
+
+# Configurado uma vez, no import: um log do DRE é só um put na fila (não bloqueia);
+# a thread do listener (ligada no lifespan) formata e escreve em stderr.
+# Nível e propagate do logger ficam como o host/uvicorn configurou.
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+
+# ==============================================================================
+#  Ciclo de vida do DB (um único client Prisma por processo)
+# ==============================================================================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Conecta o Prisma uma vez no startup e reaproveita em todas as requests."""
+    _log_listener.start()
+    try:
+        db = Prisma()
+        await db.connect()
+        app.state.db = db
+        app.state.redis = create_redis()
+        try:
+            yield
+        finally:
+            if app.state.redis is not None:
+                await app.state.redis.aclose()
+            await db.disconnect()
+    finally:
+        _log_listener.stop() # esvazia a fila antes de sair
+
+def get_db(request: Request) -> Prisma:
+    """Dependency que retorna o client compartilhado do app."""
+    return request.app.state.db
 
 # ==============================================================================
 #  Inicialização do App FastAPI
@@ -34,104 +76,191 @@ from lib.prisma_client.types import (
 app = FastAPI(
     title="Monthly DRE Report API",
     description="Lida com a geração de relatórios DRE.",
-    docs_url="/docs" 
+    docs_url="/docs",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+def _json_default(obj: Any) -> Any:
+    """Fallback do orjson: Decimal (totais e valores do Prisma) vira número."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+class DREResponse(ORJSONResponse):
+    """ORJSONResponse que serializa Decimal; datetimes o orjson já codifica em C."""
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_json_default)
+
+# Status dos recebimentos/pagamentos que entram no DRE
+PAID_STATUS = "Paga"
+
 # ==============================================================================
 #  Helper Functions (com tipagem correta)
 # ==============================================================================
-# --- FIX: Update function signature to accept datetime ---
-async def get_bank_transactions(db: Prisma, start_date: datetime, end_date: datetime):
-    """Busca transações bancárias dentro de um período."""
-    
-    # --- FIX: Use o DateTimeFilter tipado ---
-    date_filter = DateTimeFilter(gte=start_date, lte=end_date)
-    
-    # --- FIX: Use o BankTransactionsWhereInput tipado ---
-    where_clause = BankTransactionsWhereInput(
-        transaction_date=date_filter
+# Os quatro totais num único statement: um round-trip e um único snapshot,
+# então a conciliação compara números do mesmo instante (as listas não entram nele). As somas voltam
+# como texto para não passar por float no query_raw.
+_DRE_TOTALS_SQL = """
+    SELECT r.total_receitas, p.total_despesas, b.total_received_bank, b.total_paid_bank
+    FROM (
+        SELECT COALESCE(SUM(valor_pago), 0)::text AS total_receitas
+        FROM internal_receivables
+        WHERE status = $1 AND vencimento BETWEEN $2::date AND $3::date
+    ) r, (
+        SELECT COALESCE(SUM(valor_pago), 0)::text AS total_despesas
+        FROM internal_payments
+        WHERE status = $1 AND vencimento BETWEEN $2::date AND $3::date
+    ) p, (
+        SELECT COALESCE(SUM(amount_decimal) FILTER (WHERE type = 'credit'), 0)::text AS total_received_bank,
+               COALESCE(SUM(amount_decimal) FILTER (WHERE type = 'debit'), 0)::text AS total_paid_bank
+        FROM bank_transactions
+        WHERE transaction_date BETWEEN $2::date AND $3::date
+    ) b
+"""
+
+async def fetch_dre_totals(db: Prisma, start_date: date, end_date: date) -> Dict[str, Decimal]:
+    """Soma no DB as receitas/despesas pagas e os créditos/débitos bancários do período."""
+    row = await db.query_first(
+        _DRE_TOTALS_SQL,
+        PAID_STATUS,
+        start_date.isoformat(),
+        end_date.isoformat()
     )
-    
-    # Agora Pylance está feliz
-    return await db.banktransactions.find_many(where=where_clause)
-
-# --- FIX: Update function signature to accept datetime ---
-async def get_internal_receivables(db: Prisma, start_date: datetime, end_date: datetime):
-    """Busca recebíveis internos dentro de um período."""
-    
-    # --- FIX: Use o DateTimeFilter tipado ---
-    date_filter = DateTimeFilter(gte=start_date, lte=end_date)
-    
-    # --- FIX: Use o InternalReceivablesWhereInput tipado ---
-    # O campo 'data_recebimento' estava incorreto.
-    # Com base na sua assinatura, o campo correto é 'due_date' (data de vencimento)
-    # ou 'issue_date' (data de emissão). Ajuste se necessário.
-    where_clause = InternalReceivablesWhereInput(
-        due_date=date_filter 
+    return {key: Decimal(value) for key, value in row.items()}
+
+# Só as colunas que o frontend exibe nas listas; o find_many traria a linha inteira.
+# Nomes de tabela/coluna reais (os @map do schema.prisma); uma constante por tabela.
+# Contrato da resposta: paid_amount chega como float (o query_raw do Prisma converte
+# Decimal) e due_date como string 'YYYY-MM-DD', não mais como objetos do model.
+_PAID_RECEIVABLES_LIST_SQL = """
+    SELECT id, categoria AS category, entidade_nome AS entity_name,
+           valor_pago AS paid_amount, vencimento AS due_date
+    FROM internal_receivables
+    WHERE status = $1 AND vencimento BETWEEN $2::date AND $3::date
+    ORDER BY vencimento, id
+"""
+
+_PAID_PAYMENTS_LIST_SQL = """
+    SELECT id, categoria AS category, entidade_nome AS entity_name,
+           valor_pago AS paid_amount, vencimento AS due_date
+    FROM internal_payments
+    WHERE status = $1 AND vencimento BETWEEN $2::date AND $3::date
+    ORDER BY vencimento, id
+"""
+
+async def list_paid_rows(db: Prisma, list_sql: str, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """Lista os registros 'Paga' com vencimento no período, só com as colunas exibidas."""
+    return await db.query_raw(
+        list_sql,
+        PAID_STATUS,
+        start_date.isoformat(),
+        end_date.isoformat()
     )
-    
-    return await db.internalreceivables.find_many(where=where_clause)
+
+def _resolve_period(
+    year: Optional[int],
+    month: Optional[int],
+    start_date_str: Optional[str],
+    end_date_str: Optional[str]
+) -> Tuple[date, date]:
+    """Período do relatório: o mês (year/month) ou o intervalo startDate/endDate."""
+    if year is not None and month is not None:
+        if not 1 <= month <= 12:
+            raise HTTPException(status_code=400, detail="Mês inválido. Use 1-12.")
+        last_day = calendar.monthrange(year, month)[1]
+        return date(year, month, 1), date(year, month, last_day)
+
+    if start_date_str and end_date_str:
+        try:
+            return date.fromisoformat(start_date_str), date.fromisoformat(end_date_str)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de data inválido. Use YYYY-MM-DD.")
+
+    raise HTTPException(status_code=400, detail="Informe year/month ou startDate/endDate.")
 
 # ==============================================================================
 #  Endpoint da API
 # ==============================================================================
 @app.get("/")
-async def handle_get_monthly_dre(
-    start_date_str: str = Query(..., alias="startDate"),
-    end_date_str: str = Query(..., alias="endDate")
+async def get_monthly_dre(
+    year: Optional[int] = Query(None),
+    month: Optional[int] = Query(None),
+    start_date_str: Optional[str] = Query(None, alias="startDate"),
+    end_date_str: Optional[str] = Query(None, alias="endDate"),
+    include_lists: bool = Query(False),
+    db: Prisma = Depends(get_db),
+    redis: Optional[aioredis.Redis] = Depends(get_redis)
 ):
-    try:
-        start_date = date.fromisoformat(start_date_str)
-        end_date = date.fromisoformat(end_date_str)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Formato de data inválido. Use YYYY-MM-DD.")
+    start_date, end_date = _resolve_period(year, month, start_date_str, end_date_str)
+
+    # Cache hit: devolve o JSON já serializado, sem DB e sem re-serializar
+    cache_key: Optional[str] = None
+    if redis is not None:
+        try:
+            cache_key = await get_dre_cache_key(redis, start_date, end_date, include_lists)
+            cached = await redis.get(cache_key)
+            if cached is not None:
+                return Response(content=cached, media_type="application/json")
+        except Exception as e:
+            logger.warning("Erro ao ler o cache do DRE: %s", e)
+            cache_key = None
 
-    db = Prisma()
     try:
-        await db.connect()
-        
-        # --- FIX: Convert date objects to datetime objects for the query ---
-        # start_date becomes 00:00:00 on that day
-        # end_date becomes 23:59:59 on that day
-        start_datetime = datetime.combine(start_date, time.min)
-        end_datetime = datetime.combine(end_date, time.max)
-        
-        bank_tx_models = await get_bank_transactions(db, start_datetime, end_datetime)
-        internal_rx_models = await get_internal_receivables(db, start_datetime, end_datetime)
-        
-        # ... Lógica de processamento do DRE ...
-        # (Exemplo: agrupar dados, etc.)
-        
-        # --- FIX: Correção do 'to_json' ---
-        # Não chame `.to_json()`. Use `.model_dump()` para converter
-        # os modelos Pydantic em dicts. O FastAPI/JSONResponse
-        # irá serializar os dicts para JSON automaticamente.
-        
-        bank_tx_data = [tx.model_dump() for tx in bank_tx_models]
-        internal_rx_data = [rx.model_dump() for rx in internal_rx_models]
+        # Os totais são somados no DB; as listas (opcionais) saem em paralelo.
+        # Só os totais vêm de um único snapshot: cada lista é outro statement, então
+        # um lançamento gravado no meio pode aparecer na lista e não no total (ou o contrário).
+        receitas: List[Dict[str, Any]] = []
+        despesas: List[Dict[str, Any]] = []
+        if include_lists:
+            # query_raw já devolve dicts (sem validação Pydantic por linha)
+            totals, receitas, despesas = await asyncio.gather(
+                fetch_dre_totals(db, start_date, end_date),
+                list_paid_rows(db, _PAID_RECEIVABLES_LIST_SQL, start_date, end_date),
+                list_paid_rows(db, _PAID_PAYMENTS_LIST_SQL, start_date, end_date)
+            )
+        else:
+            totals = await fetch_dre_totals(db, start_date, end_date)
+
+        total_receitas = totals["total_receitas"]
+        total_despesas = totals["total_despesas"]
+        total_received_bank = totals["total_received_bank"]
+        total_paid_bank = totals["total_paid_bank"]
 
-        return JSONResponse(
+        response = DREResponse(
             status_code=200,
             content={
                 "report_period": {
-                    "start": start_date_str,
-                    "end": end_date_str
+                    "start": start_date.isoformat(),
+                    "end": end_date.isoformat()
                 },
-                "summary": {
-                    "total_bank_transactions": len(bank_tx_data),
-                    "total_internal_receivables": len(internal_rx_data)
+                "dre": {
+                    "total_receitas": total_receitas,
+                    "total_despesas": total_despesas,
+                    "net_profit": total_receitas - total_despesas
                 },
-                "data": {
-                    "bank_transactions": bank_tx_data,
-                    "internal_receivables": internal_rx_data
+                "reconciliation": {
+                    "total_received_bank": total_received_bank,
+                    "total_paid_bank": total_paid_bank,
+                    "discrepancy_receitas": total_receitas - total_received_bank,
+                    "discrepancy_despesas": total_despesas - total_paid_bank
+                },
+                "lists": {
+                    "receitas": receitas,
+                    "despesas": despesas
                 }
             }
         )
+
+        if redis is not None and cache_key is not None:
+            try:
+                await redis.set(cache_key, response.body, ex=dre_cache_ttl(end_date))
+            except Exception as e:
+                logger.warning("Erro ao gravar o cache do DRE: %s", e)
+
+        return response
         
     except Exception as e:
-        # Tente logar o erro de forma mais clara
-        print(f"Erro ao gerar DRE: {e}")
+        # Formatação lazy e com traceback; a escrita acontece na thread do listener
+        logger.exception("Erro ao gerar DRE: %s", e)
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
-    finally:
-        if db.is_connected():
-            await db.disconnect()
\ No newline at end of file
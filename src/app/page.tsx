@@ -188,6 +188,8 @@ export default function IngestionDashboard() {
   const [isReportLoading, setIsReportLoading] = useState(false);
 
   const pollingIntervalRef = useRef<NodeJS.Timeout | null>(null);
+  // Cursor do polling: id do último log recebido do job atual
+  const lastLogIdRef = useRef<number | null>(null);
   const viewportRef = useRef<HTMLDivElement>(null);
   const theme = useMantineTheme();
 
@@ -222,11 +224,18 @@ export default function IngestionDashboard() {
     if (currentJobId && isProcessing) {
       pollingIntervalRef.current = setInterval(async () => {
         try {
-          const response = await fetch(`/api/get_logs?job_id=${currentJobId}`);
+          const afterId = lastLogIdRef.current !== null ? `&after_id=${lastLogIdRef.current}` : '';
+          const response = await fetch(`/api/get_logs?job_id=${currentJobId}${afterId}`);
           if (!response.ok) throw new Error(`Server error: ${response.statusText}`);
           const data = await response.json();
+          if (data.last_id !== undefined && data.last_id !== null) {
+            lastLogIdRef.current = data.last_id;
+          }
           if (data.logs && data.logs.length > 0) {
-            const newLogs = data.logs as LogMessage[];
+            // A API envia cada log como o par [type, text]
+            const newLogs: LogMessage[] = (data.logs as [LogType, string][]).map(
+              ([type, text]) => ({ type, text })
+            );
             addLogs(newLogs);
             const lastLog = newLogs[newLogs.length - 1];
             if ((lastLog.type === 'success' || lastLog.type === 'error') && lastLog.text.includes("Job")) {
@@ -271,6 +280,7 @@ export default function IngestionDashboard() {
     }
     setIsProcessing(true);
     setCurrentJobId(null);
+    lastLogIdRef.current = null;
     setLogMessages([]);
     addLogs([{ type: 'info', text: `Uploading ${file.name} to ${endpoint}...` }]);
     try {
@@ -299,7 +309,7 @@ export default function IngestionDashboard() {
     setIsReportLoading(true);
     setDreData(null);
     try {
-      const response = await fetch(`/api/reports/monthly_dre?year=${reportYear}&month=${reportMonth}`);
+      const response = await fetch(`/api/reports/monthly_dre?year=${reportYear}&month=${reportMonth}&include_lists=true`);
       const data = await response.json();
       if (!response.ok) throw new Error(data.detail || 'Failed to generate report');
       setDreData(data);
@@ -0,0 +1,47 @@
+# src/lib/dre_cache.py
+import logging
+import os
+from datetime import date
+from typing import Optional
+
+import redis.asyncio as aioredis
+from fastapi import Request
+
+# ==============================================================================
+#  Cache do DRE (Redis opcional: sem REDIS_URL o cache fica desligado)
+# ==============================================================================
+# Lido por reports/monthly_dre.py e incrementado pelas ingestões; faz parte
+# da chave dos relatórios, então incrementá-lo invalida todos de uma vez.
+DRE_CACHE_VERSION_KEY = "dre:version"
+DRE_CACHE_TTL_CURRENT = 300 # período que inclui hoje: ainda pode mudar
+DRE_CACHE_TTL_CLOSED = 86400 # período fechado
+
+# Mesmo logger de reports/monthly_dre.py: falhas do cache aparecem juntas
+logger = logging.getLogger("dre")
+
+def create_redis() -> Optional[aioredis.Redis]:
+    """Client Redis a partir de REDIS_URL, ou None se o cache não estiver configurado."""
+    url = os.environ.get("REDIS_URL")
+    return aioredis.from_url(url) if url else None
+
+def get_redis(request: Request) -> Optional[aioredis.Redis]:
+    """Dependency que retorna o client Redis do app (ou None)."""
+    return request.app.state.redis
+
+async def get_dre_cache_key(redis: aioredis.Redis, start_date: date, end_date: date, include_lists: bool) -> str:
+    """Chave do relatório no cache, amarrada à versão atual dos dados."""
+    version = await redis.get(DRE_CACHE_VERSION_KEY)
+    return f"dre:{int(version or 0)}:{start_date.isoformat()}:{end_date.isoformat()}:{int(include_lists)}"
+
+def dre_cache_ttl(end_date: date) -> int:
+    """TTL do relatório: curto se o período ainda inclui hoje, longo se já fechou."""
+    return DRE_CACHE_TTL_CURRENT if end_date >= date.today() else DRE_CACHE_TTL_CLOSED
+
+async def invalidate_dre_cache(redis: Optional[aioredis.Redis]):
+    """Invalida os DREs em cache após gravar novos dados."""
+    if redis is None:
+        return
+    try:
+        await redis.incr(DRE_CACHE_VERSION_KEY)
+    except Exception as e:
+        logger.warning("Erro ao invalidar o cache do DRE: %s", e)
@@ -1,85 +1,127 @@
 # src/lib/parsers/bank_parser.py
+import math
 import pdfplumber
 import re
-from typing import List, Dict, Any, Optional
+from concurrent.futures import Executor
+from typing import List, Dict, Any, Optional, Iterator
+
+from lib.parsers.page_pool import iter_pages
 
 # ==============================================================================
 #  HELPER FUNCTIONS (Corrigidos para aceitar None)
 # ==============================================================================
 
-def _clean_text(text: Optional[str]) -> str:
-    """Limpa o texto de uma célula do PDF, lidando com None."""
-    if text:
-        return text.replace('\n', ' ').strip()
-    return ""
-
-def _is_date_like(s: Optional[str]) -> bool:
-    """Verifica se uma string parece 'dd/mm/yyyy', lidando com None."""
-    s_clean = _clean_text(s) # s_clean será sempre str
-    if s_clean:
-        return bool(re.match(r'^\d{2}/\d{2}/\d{4}$', s_clean))
-    return False
-
-def _is_value_like(s: Optional[str]) -> bool:
-    """Verifica se uma string parece '1.234,56 (+)', lidando com None."""
-    s_clean = _clean_text(s) # s_clean será sempre str
-    if s_clean:
-        return bool(re.search(r'(\(\+\)|\(-\))$', s_clean))
-    return False
+# Marcador de crédito/débito no fim do valor: ' C', ' D', ' (+)' ou ' (-)'
+_AMOUNT_SUFFIX_RE = re.compile(r'\s+(?:[CD]|\([+-]\))$')
+# Remove o separador de milhar e troca a vírgula decimal, numa só passada
+_AMOUNT_TABLE = str.maketrans({'.': None, ',': '.'})
+
+def _brl_amount_to_float(raw_value: str) -> float:
+    """
+    Converte um valor BRL do extrato ('1.234,56 C' ou '1.234,56 (+)') em float (0.0 se inválido).
+    Só o marcador final é removido; um '-' no início ou no fim do número é mantido como sinal.
+    """
+    amount_str = _AMOUNT_SUFFIX_RE.sub('', raw_value.strip(), count=1)
+    negative = amount_str.endswith('-')
+    if negative:
+        amount_str = amount_str[:-1]
+    try:
+        amount = float(amount_str.translate(_AMOUNT_TABLE))
+    except ValueError:
+        return 0.0
+    if not math.isfinite(amount): # float() aceita 'nan'/'inf'
+        return 0.0
+    return -amount if negative else amount
+
+def _chunked(items: Iterator[Dict[str, Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Agrupa as transações em blocos de até chunk_size itens.
+    Fechar os blocos (close()) fecha também a fonte: o PDF e os blocos de páginas pendentes.
+    """
+    chunk: List[Dict[str, Any]] = []
+    try:
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        close = getattr(items, "close", None)
+        if close is not None:
+            close()
 
 # ==============================================================================
 #  PARSER PÚBLICO: 2024
 # ==============================================================================
-def parse_2024(pdf_path: str, source_file_name: str) -> List[Dict[str, Any]]:
+# Precompilado: é testado na primeira célula de toda linha de toda tabela
+_DATE_RE = re.compile(r'^\d{2}/\d{2}/\d{4}$')
+
+def _iter_2024_page_rows(pdf_path: str, start: int, stop: int, source_file_name: str) -> Iterator[Dict[str, Any]]:
+    """Gera as transações das páginas [start, stop) de um PDF 2024. Erros são propagados."""
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            tables = page.extract_tables()
+            if not tables:
+                continue
+
+            for table in tables:
+                for row in table:
+                    if len(row) != 8 or row[0] is None:
+                        continue
+                    balance_date = row[0].replace('\n', ' ').strip()
+                    if _DATE_RE.match(balance_date) is None:
+                        continue
+
+                    # Cada célula é limpa uma única vez (células multi-linha viram uma linha; None vira "")
+                    movement_date, agency_origin, lote, history, document, raw_value, raw_balance = (
+                        cell.replace('\n', ' ').strip() if cell else "" for cell in row[1:]
+                    )
+
+                    type = 'credit' if ' C' in raw_value else 'debit'
+                    amount = _brl_amount_to_float(raw_value)
+
+                    transaction_data = {
+                        "transaction_date": movement_date or balance_date,
+                        "posting_date": balance_date,
+                        "type": type,
+                        "amount": amount,
+                        "raw_history_text": history,
+                        "raw_value_text": raw_value,
+                        "raw_balance_text": raw_balance,
+                        "source_file_name": source_file_name,
+                        "raw_json_data": {
+                            "lote": lote,
+                            "document": document,
+                            "agency_origin": agency_origin
+                        }
+                    }
+                    yield transaction_data
+
+def _iter_2024_rows(pdf_path: str, source_file_name: str, executor: Optional[Executor] = None) -> Iterator[Dict[str, Any]]:
+    """Gera as transações de um PDF 2024, uma a uma; com executor, os blocos de páginas rodam em paralelo."""
+    return iter_pages(_iter_2024_page_rows, pdf_path, source_file_name, executor)
+
+def iter_2024(
+    pdf_path: str,
+    source_file_name: str,
+    chunk_size: int = 500,
+    executor: Optional[Executor] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    [LIB V7] Parseia PDFs no formato 2024 em blocos de até chunk_size transações.
+    Permite inserir um bloco enquanto o próximo é parseado. Erros são propagados.
+    """
+    return _chunked(_iter_2024_rows(pdf_path, source_file_name, executor), chunk_size)
+
+def parse_2024(pdf_path: str, source_file_name: str, executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
     """
     [LIB V6] Parseia PDFs no formato 2024.
     Projetado para ser importado como um módulo.
     """
-    all_transactions = []
-    
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                if not tables:
-                    continue
-
-                for table in tables:
-                    for row in table:
-                        # A checagem _is_date_like(row[0]) agora é segura
-                        if len(row) == 8 and _is_date_like(row[0]):
-                            
-                            balance_date = _clean_text(row[0])
-                            movement_date = _clean_text(row[1])
-                            raw_value = _clean_text(row[6])
-                            raw_balance = _clean_text(row[7])
-
-                            type = 'credit' if ' C' in raw_value else 'debit'
-                            amount_str = raw_value.replace(' C', '').replace(' D', '').replace('.', '').replace(',', '.')
-                            
-                            try:
-                                amount = float(amount_str)
-                            except ValueError:
-                                amount = 0.0
-
-                            transaction_data = {
-                                "transaction_date": movement_date or balance_date,
-                                "posting_date": balance_date,
-                                "type": type,
-                                "amount": amount,
-                                "raw_history_text": _clean_text(row[4]),
-                                "raw_value_text": raw_value,
-                                "raw_balance_text": raw_balance,
-                                "source_file_name": source_file_name,
-                                "raw_json_data": {
-                                    "lote": _clean_text(row[3]),
-                                    "document": _clean_text(row[5]),
-                                    "agency_origin": _clean_text(row[2])
-                                }
-                            }
-                            all_transactions.append(transaction_data)
-        
-        return all_transactions
+        return list(_iter_2024_rows(pdf_path, source_file_name, executor))
 
     except Exception as e:
         print(f"Erro no parse_2024: {e}")
@@ -98,67 +140,78 @@ _line_regex_2025 = re.compile(
     re.DOTALL | re.MULTILINE
 )
 
-def parse_2025(pdf_path: str, source_file_name: str) -> List[Dict[str, Any]]:
-    """
-    [LIB V6] Parseia PDFs no formato 2025.
-    Usa Regex no texto puro, abandonando extract_tables().
-    """
-    all_transactions = []
-    
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
+def _iter_2025_page_rows(pdf_path: str, start: int, stop: int, source_file_name: str) -> Iterator[Dict[str, Any]]:
+    """Gera as transações das páginas [start, stop) de um PDF 2025. Erros são propagados."""
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            
+            header_text = page.search("Lançamentos")
+            footer_text_1 = page.search("Informações Adicionais")
+            footer_text_2 = page.search("Lançamentos Futuros")
+
+            crop_top = header_text[0]['bottom'] if header_text else 50
+            crop_bottom_1 = footer_text_1[0]['top'] if footer_text_1 else page.height
+            crop_bottom_2 = footer_text_2[0]['top'] if footer_text_2 else page.height
+            crop_bottom = min(crop_bottom_1, crop_bottom_2, page.height) - 5
+            
+            if crop_top >= crop_bottom:
+                continue
                 
-                header_text = page.search("Lançamentos")
-                footer_text_1 = page.search("Informações Adicionais")
-                footer_text_2 = page.search("Lançamentos Futuros")
-
-                crop_top = header_text[0]['bottom'] if header_text else 50
-                crop_bottom_1 = footer_text_1[0]['top'] if footer_text_1 else page.height
-                crop_bottom_2 = footer_text_2[0]['top'] if footer_text_2 else page.height
-                crop_bottom = min(crop_bottom_1, crop_bottom_2, page.height) - 5
+            bbox = (0, crop_top, page.width, crop_bottom)
+            cropped_page = page.crop(bbox)
+            page_text = cropped_page.extract_text()
+
+            if not page_text:
+                continue
                 
-                if crop_top >= crop_bottom:
-                    continue
-                    
-                bbox = (0, crop_top, page.width, crop_bottom)
-                cropped_page = page.crop(bbox)
-                page_text = cropped_page.extract_text()
-
-                if not page_text:
-                    continue
-                    
-                matches = _line_regex_2025.finditer(page_text)
+            matches = _line_regex_2025.finditer(page_text)
+            
+            for match in matches:
+                date = match.group(1).strip()
+                raw_value = match.group(5).strip()
                 
-                for match in matches:
-                    date = match.group(1).strip()
-                    raw_value = match.group(5).strip()
-                    
-                    type = 'credit' if '(+)' in raw_value else 'debit'
-                    amount_str = raw_value.replace(' (+)', '').replace(' (-)', '').replace('.', '').replace(',', '.')
-                    
-                    try:
-                        amount = float(amount_str)
-                    except ValueError:
-                        amount = 0.0
-
-                    transaction_data = {
-                        "transaction_date": date,
-                        "posting_date": date,
-                        "type": type,
-                        "amount": amount,
-                        "raw_history_text": match.group(4).strip().replace('\n', ' '),
-                        "raw_value_text": raw_value,
-                        "raw_balance_text": None,
-                        "source_file_name": source_file_name,
-                        "raw_json_data": {
-                            "lote": match.group(2).strip(),
-                            "document": match.group(3).strip()
-                        }
+                type = 'credit' if '(+)' in raw_value else 'debit'
+                amount = _brl_amount_to_float(raw_value)
+
+                transaction_data = {
+                    "transaction_date": date,
+                    "posting_date": date,
+                    "type": type,
+                    "amount": amount,
+                    "raw_history_text": match.group(4).strip().replace('\n', ' '),
+                    "raw_value_text": raw_value,
+                    "raw_balance_text": None,
+                    "source_file_name": source_file_name,
+                    "raw_json_data": {
+                        "lote": match.group(2).strip(),
+                        "document": match.group(3).strip()
                     }
-                    all_transactions.append(transaction_data)
+                }
+                yield transaction_data
+
+def _iter_2025_rows(pdf_path: str, source_file_name: str, executor: Optional[Executor] = None) -> Iterator[Dict[str, Any]]:
+    """Gera as transações de um PDF 2025, uma a uma; com executor, os blocos de páginas rodam em paralelo."""
+    return iter_pages(_iter_2025_page_rows, pdf_path, source_file_name, executor)
+
+def iter_2025(
+    pdf_path: str,
+    source_file_name: str,
+    chunk_size: int = 500,
+    executor: Optional[Executor] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    [LIB V7] Parseia PDFs no formato 2025 em blocos de até chunk_size transações.
+    Permite inserir um bloco enquanto o próximo é parseado. Erros são propagados.
+    """
+    return _chunked(_iter_2025_rows(pdf_path, source_file_name, executor), chunk_size)
 
-        return all_transactions
+def parse_2025(pdf_path: str, source_file_name: str, executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
+    """
+    [LIB V6] Parseia PDFs no formato 2025.
+    Usa Regex no texto puro, abandonando extract_tables().
+    """
+    try:
+        return list(_iter_2025_rows(pdf_path, source_file_name, executor))
 
     except Exception as e:
         print(f"Erro no parse_2025: {e}")
@@ -1,10 +1,13 @@
 # src/lib/parsers/internal_parser.py
 import pdfplumber
 import re
+from concurrent.futures import Executor
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from typing import List, Dict, Any, Optional
 
+from lib.parsers.page_pool import iter_pages
+
 # ==============================================================================
 #  HELPER FUNCTIONS
 # ==============================================================================
@@ -20,16 +23,21 @@ def _to_date_obj(date_str: Optional[str]) -> Optional[datetime]:
     if not date_str:
         return None
     try:
-        return datetime.strptime(date_str.strip(), '%d/%m/%Y')
+        # Formato fixo: split manual é bem mais rápido que strptime
+        day, month, year = date_str.strip().split('/')
+        return datetime(int(year), int(month), int(day))
     except (ValueError, TypeError):
         return None
 
+# Remove o separador de milhar e troca a vírgula decimal, numa só passada
+_DEC_TABLE = str.maketrans({'.': None, ',': '.'})
+
 def _to_decimal(val_str: Optional[str]) -> Optional[Decimal]:
     """Converte '1.234,56' para Decimal, lidando com None e '0,00'."""
     if not val_str:
         return None
     try:
-        cleaned = val_str.strip().replace('.', '').replace(',', '.')
+        cleaned = val_str.strip().translate(_DEC_TABLE)
         if not cleaned:
             return None
         return Decimal(cleaned)
@@ -39,60 +47,70 @@ def _to_decimal(val_str: Optional[str]) -> Optional[Decimal]:
 # ==============================================================================
 #  PARSER: PAGAMENTOS (novembro-pagamentos.pdf)
 # ==============================================================================
-def parse_pagamentos(pdf_path: str, source_file_name: str) -> List[Dict[str, Any]]:
+def _parse_pagamentos_pages(pdf_path: str, start: int, stop: int, source_file_name: str) -> List[Dict[str, Any]]:
+    """Parseia as páginas [start, stop) do PDF de "Contas a Pagar". Erros de leitura são propagados."""
+    all_transactions = []
+    
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            tables = page.extract_tables()
+            if not tables:
+                continue
+
+            for table in tables:
+                for row in table:
+                    if not row:
+                        continue
+
+                    # A primeira célula é limpa uma vez: filtro do cabeçalho e 'category'
+                    category = row[0].replace('\n', ' ').strip() if row[0] else ""
+
+                    # Pula a linha de cabeçalho
+                    if category == "Categoria":
+                        continue
+                    
+                    # Uma linha válida tem 11 colunas
+                    if len(row) == 11:
+                        try:
+                            # Coluna 3: "Parcela Emissão"
+                            col3_parts = _clean_text(row[3]).split()
+                            parcela = col3_parts[-1] if col3_parts else None
+                            emissao = col3_parts[0] if col3_parts else None
+                            
+                            # Coluna 4: "Vencimento Valor Integral"
+                            col4_parts = _clean_text(row[4]).split()
+                            valor_integral = col4_parts[-1] if col4_parts else None
+                            vencimento = col4_parts[0] if col4_parts else None
+
+                            data = {
+                                "category": category,
+                                "entity_name": _clean_text(row[1]),
+                                "entity_type": _clean_text(row[2]),
+                                "installment": parcela,
+                                "issue_date": _to_date_obj(emissao),
+                                "due_date": _to_date_obj(vencimento),
+                                "full_amount": _to_decimal(valor_integral),
+                                "discount_amount": _to_decimal(row[5]),
+                                "updated_amount": _to_decimal(row[6]),
+                                "paid_amount": _to_decimal(row[7]),
+                                "notes": _clean_text(row[8]),
+                                "status": _clean_text(row[9]),
+                                "source_file_name": source_file_name
+                            }
+                            all_transactions.append(data)
+                        except Exception as e:
+                            print(f"Erro ao processar linha (pagamentos): {row} | Erro: {e}")
+                            continue
+    
+    return all_transactions
+
+def parse_pagamentos(pdf_path: str, source_file_name: str, executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
     """
     Parseia o PDF de "Contas a Pagar".
-   
+    Com executor, os blocos de páginas são parseados em paralelo.
     """
-    all_transactions = []
-    
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                if not tables:
-                    continue
-
-                for table in tables:
-                    for row in table:
-                        # Pula a linha de cabeçalho
-                        if not row or _clean_text(row[0]) == "Categoria":
-                            continue
-                        
-                        # Uma linha válida tem 11 colunas
-                        if len(row) == 11:
-                            try:
-                                # Coluna 3: "Parcela Emissão"
-                                col3_parts = _clean_text(row[3]).split()
-                                parcela = col3_parts[-1] if col3_parts else None
-                                emissao = col3_parts[0] if col3_parts else None
-                                
-                                # Coluna 4: "Vencimento Valor Integral"
-                                col4_parts = _clean_text(row[4]).split()
-                                valor_integral = col4_parts[-1] if col4_parts else None
-                                vencimento = col4_parts[0] if col4_parts else None
-
-                                data = {
-                                    "category": _clean_text(row[0]),
-                                    "entity_name": _clean_text(row[1]),
-                                    "entity_type": _clean_text(row[2]),
-                                    "installment": parcela,
-                                    "issue_date": _to_date_obj(emissao),
-                                    "due_date": _to_date_obj(vencimento),
-                                    "full_amount": _to_decimal(valor_integral),
-                                    "discount_amount": _to_decimal(row[5]),
-                                    "updated_amount": _to_decimal(row[6]),
-                                    "paid_amount": _to_decimal(row[7]),
-                                    "notes": _clean_text(row[8]),
-                                    "status": _clean_text(row[9]),
-                                    "source_file_name": source_file_name
-                                }
-                                all_transactions.append(data)
-                            except Exception as e:
-                                print(f"Erro ao processar linha (pagamentos): {row} | Erro: {e}")
-                                continue
-        
-        return all_transactions
+        return list(iter_pages(_parse_pagamentos_pages, pdf_path, source_file_name, executor))
 
     except Exception as e:
         print(f"Erro no parse_pagamentos: {e}")
@@ -116,12 +134,13 @@ def _process_recebimento_row(row: List[Optional[str]], source_file_name: str) ->
             "phone": _clean_text(row[3]),
             "financial_responsible": _clean_text(row[4]),
             "installment": _clean_text(row[5]),
-            "issue_date": _to_date_obj(_clean_text(row[6])),
-            "due_date": _to_date_obj(_clean_text(row[7])),
-            "full_amount": _to_decimal(_clean_text(row[8])),
-            "discount_amount": _to_decimal(_clean_text(row[9])),
-            "updated_amount": _to_decimal(_clean_text(row[10])),
-            "paid_amount": _to_decimal(_clean_text(row[11])),
+            # _to_date_obj/_to_decimal já fazem o strip(); sem _clean_text extra
+            "issue_date": _to_date_obj(row[6]),
+            "due_date": _to_date_obj(row[7]),
+            "full_amount": _to_decimal(row[8]),
+            "discount_amount": _to_decimal(row[9]),
+            "updated_amount": _to_decimal(row[10]),
+            "paid_amount": _to_decimal(row[11]),
             "notes": _clean_text(row[12]),
             "status": _clean_text(row[13]),
             "contract_status": _clean_text(row[14]),
@@ -137,58 +156,82 @@ def _process_recebimento_row(row: List[Optional[str]], source_file_name: str) ->
         print(f"Erro ao processar buffer (recebimentos): {row} | Erro: {e}")
         return None
 
-def parse_recebimentos(pdf_path: str, source_file_name: str) -> List[Dict[str, Any]]:
+# Colunas que podem ter múltiplas linhas: 1: Entidade-Nome, 3: Telefone, 4: Responsável
+_MULTILINE_COLS_RECEBIMENTOS = (1, 3, 4)
+
+def _merge_multiline(row_buffer: List[Optional[str]], multiline_parts: Dict[int, List[str]]) -> List[Optional[str]]:
+    """Une, uma única vez, as partes acumuladas de cada coluna multi-linha do registro."""
+    merged = list(row_buffer)
+    for col, parts in multiline_parts.items():
+        merged[col] = " ".join(part for part in parts if part)
+    return merged
+
+def _parse_recebimentos_pages(pdf_path: str, start: int, stop: int, source_file_name: str) -> List[Dict[str, Any]]:
     """
-    Parseia o PDF de "Contas a Receber".
-    Este parser lida com linhas que se quebram em várias linhas de tabela.
-   
+    Parseia as páginas [start, stop) do PDF de "Contas a Receber".
+    O buffer de continuação é por tabela, então cada página é independente.
     """
     all_transactions = []
     
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                if not tables:
-                    continue
-
-                for table in tables:
-                    row_buffer: List[Optional[str]] = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            tables = page.extract_tables()
+            if not tables:
+                continue
+
+            for table in tables:
+                row_buffer: List[Optional[str]] = []
+                # Partes das colunas multi-linha do registro atual; o join é feito
+                # no flush, em vez de recopiar o texto a cada linha de continuação
+                multiline_parts: Dict[int, List[str]] = {}
+                
+                for row in table:
+                    if not row:
+                        continue
                     
-                    for row in table:
-                        if not row:
-                            continue
-                        
-                        # Pula a linha de cabeçalho
-                        if _clean_text(row[0]) == "Categoria":
-                            continue
-                        
-                        # Se a primeira célula NÃO está vazia, é uma nova transação.
-                        # Processamos o buffer anterior e iniciamos um novo.
-                        if _clean_text(row[0]):
-                            if row_buffer:
-                                processed = _process_recebimento_row(row_buffer, source_file_name)
-                                if processed:
-                                    all_transactions.append(processed)
-                            row_buffer = list(row)
-                        
-                        # Se a primeira célula ESTÁ vazia, é uma continuação.
-                        # Anexamos os dados ao buffer existente.
-                        elif row_buffer:
-                            # Colunas que podem ter múltiplas linhas:
-                            # 1: Entidade-Nome, 3: Telefone, 4: Responsável
-                            if len(row) > 4:
-                                row_buffer[1] = _clean_text(row_buffer[1]) + " " + _clean_text(row[1])
-                                row_buffer[3] = _clean_text(row_buffer[3]) + " " + _clean_text(row[3])
-                                row_buffer[4] = _clean_text(row_buffer[4]) + " " + _clean_text(row[4])
+                    # A primeira célula é limpa uma vez para os dois testes abaixo
+                    first_cell = row[0].replace('\n', ' ').strip() if row[0] else ""
+
+                    # Pula a linha de cabeçalho
+                    if first_cell == "Categoria":
+                        continue
                     
-                    # Processa a última transação no buffer
-                    if row_buffer:
-                        processed = _process_recebimento_row(row_buffer, source_file_name)
-                        if processed:
-                            all_transactions.append(processed)
-        
-        return all_transactions
+                    # Se a primeira célula NÃO está vazia, é uma nova transação.
+                    # Processamos o buffer anterior e iniciamos um novo.
+                    if first_cell:
+                        if row_buffer:
+                            processed = _process_recebimento_row(_merge_multiline(row_buffer, multiline_parts), source_file_name)
+                            if processed:
+                                all_transactions.append(processed)
+                        row_buffer = list(row)
+                        multiline_parts = {
+                            col: [_clean_text(row[col])]
+                            for col in _MULTILINE_COLS_RECEBIMENTOS if col < len(row)
+                        }
+                    
+                    # Se a primeira célula ESTÁ vazia, é uma continuação.
+                    # Anexamos os dados às partes do registro atual.
+                    elif row_buffer:
+                        if len(row) > 4:
+                            for col, parts in multiline_parts.items():
+                                parts.append(_clean_text(row[col]))
+                
+                # Processa a última transação no buffer
+                if row_buffer:
+                    processed = _process_recebimento_row(_merge_multiline(row_buffer, multiline_parts), source_file_name)
+                    if processed:
+                        all_transactions.append(processed)
+    
+    return all_transactions
+
+def parse_recebimentos(pdf_path: str, source_file_name: str, executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
+    """
+    Parseia o PDF de "Contas a Receber".
+    Este parser lida com linhas que se quebram em várias linhas de tabela.
+    Com executor, os blocos de páginas são parseados em paralelo.
+    """
+    try:
+        return list(iter_pages(_parse_recebimentos_pages, pdf_path, source_file_name, executor))
 
     except Exception as e:
         print(f"Erro no parse_recebimentos: {e}")
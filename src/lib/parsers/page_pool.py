@@ -0,0 +1,74 @@
+# src/lib/parsers/page_pool.py
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Tuple, Callable
+
+import pdfplumber
+
+# ==============================================================================
+#  PARALELISMO POR PÁGINA (compartilhado pelos parsers)
+# ==============================================================================
+# Parseia as páginas [start, stop) de um PDF: (pdf_path, start, stop, source_file_name)
+PagesFn = Callable[[str, int, int, str], Iterable[Dict[str, Any]]]
+
+def create_page_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Pool de processos de vida longa (criado no lifespan) para parsear blocos de páginas.
+    Usa forkserver/spawn: os workers não herdam, via fork, as threads do app
+    (uvloop, asyncpg, engine do Prisma), e a partida do pool é paga uma vez só.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    try:
+        return ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=context)
+    except OSError:
+        # Ambientes sem semáforos POSIX (ex.: AWS Lambda/Vercel) não suportam
+        # multiprocessing; sem pool, os parsers rodam no processo atual.
+        return None
+
+def shutdown_page_pool(pool: Optional[Executor]):
+    """Encerra o pool no fim do lifespan, descartando blocos ainda não iniciados."""
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+def page_ranges(n_pages: int, n_parts: int) -> List[Tuple[int, int]]:
+    """Divide as páginas em até n_parts intervalos contíguos [start, stop)."""
+    if n_pages <= 0:
+        return []
+    size = -(-n_pages // max(1, min(n_parts, n_pages)))
+    return [(start, min(start + size, n_pages)) for start in range(0, n_pages, size)]
+
+def _collect_pages(pages_fn: PagesFn, pdf_path: str, start: int, stop: int, source_file_name: str) -> List[Dict[str, Any]]:
+    """Roda no worker: cada processo abre o próprio handle do PDF e parseia seu bloco."""
+    return list(pages_fn(pdf_path, start, stop, source_file_name))
+
+def iter_pages(
+    pages_fn: PagesFn,
+    pdf_path: str,
+    source_file_name: str,
+    executor: Optional[Executor] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Parseia o PDF em blocos de páginas no executor e gera as linhas na ordem do PDF,
+    à medida que os blocos ficam prontos. Sem executor, parseia no processo atual.
+    Se o iterador for abandonado (close() ou GC), os blocos pendentes são cancelados.
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        n_pages = len(pdf.pages)
+    ranges = page_ranges(n_pages, os.cpu_count() or 1)
+
+    if executor is None or len(ranges) <= 1:
+        yield from pages_fn(pdf_path, 0, n_pages, source_file_name)
+        return
+
+    futures = [
+        executor.submit(_collect_pages, pages_fn, pdf_path, start, stop, source_file_name)
+        for start, stop in ranges
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
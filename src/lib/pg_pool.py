@@ -0,0 +1,47 @@
+# src/lib/pg_pool.py
+import os
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import asyncpg
+
+# ==============================================================================
+#  Pool asyncpg (a partir da mesma DATABASE_URL do Prisma)
+# ==============================================================================
+# Parâmetros da URL que só o Prisma entende. O asyncpg repassaria cada um como
+# configuração do servidor, e o Postgres recusaria a conexão no startup.
+_PRISMA_ONLY_PARAMS = {
+    "schema", "pgbouncer", "connection_limit", "pool_timeout", "connect_timeout",
+    "socket_timeout", "statement_cache_size", "sslidentity", "sslaccept",
+}
+
+def asyncpg_connect_args(database_url: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Converte a DATABASE_URL do Prisma no DSN e nos kwargs de conexão do asyncpg.
+    'schema' vira o search_path; com 'pgbouncer=true' o cache de prepared
+    statements é desligado (não funciona com o pgbouncer em modo transaction).
+    """
+    parts = urlsplit(database_url)
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    prisma_params = {key: value for key, value in params if key in _PRISMA_ONLY_PARAMS}
+    dsn = urlunsplit(parts._replace(
+        query=urlencode([(key, value) for key, value in params if key not in _PRISMA_ONLY_PARAMS])
+    ))
+
+    connect_kwargs: Dict[str, Any] = {}
+    if prisma_params.get("schema"):
+        connect_kwargs["server_settings"] = {"search_path": prisma_params["schema"]}
+    if prisma_params.get("pgbouncer", "").lower() == "true":
+        connect_kwargs["statement_cache_size"] = 0
+    return dsn, connect_kwargs
+
+async def create_pg_pool() -> asyncpg.Pool:
+    """Pool de conexões do processo (criado no lifespan), a partir de DATABASE_URL."""
+    dsn, connect_kwargs = asyncpg_connect_args(os.environ["DATABASE_URL"])
+    return await asyncpg.create_pool(
+        dsn,
+        min_size=5,
+        max_size=20,
+        command_timeout=30,
+        **connect_kwargs
+    )
@@ -0,0 +1,28 @@
+# src/lib/uploads.py
+import os
+import tempfile
+
+import aiofiles
+from fastapi import UploadFile
+
+# ==============================================================================
+#  Upload (compartilhado pelas ingestões)
+# ==============================================================================
+_UPLOAD_CHUNK_SIZE = 1 << 20 # 1 MiB
+
+async def save_upload_to_tmp(file: UploadFile) -> str:
+    """
+    Grava o upload em /tmp em blocos, sem carregar o arquivo inteiro na memória.
+    Se a cópia falhar no meio, o arquivo parcial é removido antes de propagar o erro.
+    """
+    fd, temp_file_path = tempfile.mkstemp(dir="/tmp", suffix=file.filename)
+    os.close(fd)
+    try:
+        async with aiofiles.open(temp_file_path, "wb") as out:
+            while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+                await out.write(chunk)
+    except BaseException:
+        # O handler só recebe o caminho no sucesso; sem isso o arquivo ficaria em /tmp
+        os.remove(temp_file_path)
+        raise
+    return temp_file_path
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Mesmo layout das funções na Vercel: os módulos são importados como lib.*
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,112 @@
+# tests/test_bank_parser.py
+import pytest
+
+from lib.parsers import bank_parser
+from lib.parsers.bank_parser import _brl_amount_to_float, _chunked, _iter_2024_page_rows
+
+
+@pytest.mark.parametrize("raw_value, expected", [
+    ("1.234,56 C", 1234.56),
+    ("0,50 D", 0.5),
+    ("12.345,67 (+)", 12345.67),
+    ("9,99 (-)", 9.99),
+    ("1.000.000,00", 1000000.0),
+])
+def test_brl_amount_strips_only_the_suffix_marker(raw_value, expected):
+    assert _brl_amount_to_float(raw_value) == expected
+
+
+@pytest.mark.parametrize("raw_value, expected", [
+    ("-5,00", -5.0),
+    ("1.234,56-", -1234.56),
+    ("-5,00 D", -5.0),
+    ("1.234,56- C", -1234.56),
+])
+def test_brl_amount_keeps_the_sign(raw_value, expected):
+    assert _brl_amount_to_float(raw_value) == expected
+
+
+@pytest.mark.parametrize("raw_value", [
+    "", "abc", "C", "1.2C3,4", "12D,00", "1,00C D", "nan", "inf", "(+)",
+])
+def test_brl_amount_malformed_falls_back_to_zero(raw_value):
+    assert _brl_amount_to_float(raw_value) == 0.0
+
+
+def test_chunked_closing_early_closes_the_source():
+    closed = []
+
+    def rows():
+        try:
+            for i in range(10):
+                yield {"i": i}
+        finally:
+            closed.append(True)
+
+    chunks = _chunked(rows(), 3)
+    assert len(next(chunks)) == 3
+    chunks.close()
+    assert closed == [True]
+
+
+class _FakePage:
+    def __init__(self, tables):
+        self._tables = tables
+
+    def extract_tables(self):
+        return self._tables
+
+
+class _FakePdf:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _parse_2024_table(monkeypatch, rows):
+    """Passa as linhas como saem do extract_tables() de uma página do extrato 2024."""
+    pdf = _FakePdf([_FakePage([rows])])
+    monkeypatch.setattr(bank_parser.pdfplumber, "open", lambda path: pdf)
+    return list(_iter_2024_page_rows("extrato.pdf", 0, 1, "extrato.pdf"))
+
+
+# [dt balancete, dt movimento, ag. origem, lote, histórico, documento, valor, saldo]
+def test_2024_header_continuation_and_short_rows_are_skipped(monkeypatch):
+    rows = [
+        ["Dt. balancete", "Dt. movimento", "Ag. origem", "Lote", "Histórico", "Documento", "Valor R$", "Saldo"],
+        [None, None, None, None, "continuação", None, None, None],
+        ["02/01/2024", "0000", "Pix", "1,00 C"],
+    ]
+    assert _parse_2024_table(monkeypatch, rows) == []
+
+
+def test_2024_wrapped_history_is_kept_on_one_line(monkeypatch):
+    rows = [["02/01/2024", "02/01/2024", "0000", "14397", "Pix - Enviado\n02/01 12:34 FULANO", "123.456", "150,00 D", ""]]
+    [t] = _parse_2024_table(monkeypatch, rows)
+    assert t["raw_history_text"] == "Pix - Enviado 02/01 12:34 FULANO"
+    assert t["type"] == "debit"
+    assert t["amount"] == 150.0
+    assert t["raw_json_data"] == {"lote": "14397", "document": "123.456", "agency_origin": "0000"}
+
+
+def test_2024_empty_cells_and_numeric_history_stay_in_their_columns(monkeypatch):
+    rows = [["02/01/2024", None, "0000", None, "Tarifa Pacote 2024", None, "35,00 D", "1.115,00 C"]]
+    [t] = _parse_2024_table(monkeypatch, rows)
+    assert t["raw_history_text"] == "Tarifa Pacote 2024"
+    assert t["raw_json_data"] == {"lote": "", "document": "", "agency_origin": "0000"}
+    assert t["transaction_date"] == "02/01/2024"
+    assert t["raw_balance_text"] == "1.115,00 C"
+
+
+def test_2024_credit_row(monkeypatch):
+    rows = [[" 03/01/2024\n", "03/01/2024", "", "13105", "Pix - Recebido", "", "1.234,56 C", "2.349,56 C"]]
+    [t] = _parse_2024_table(monkeypatch, rows)
+    assert t["posting_date"] == "03/01/2024"
+    assert t["type"] == "credit"
+    assert t["amount"] == 1234.56
+    assert t["source_file_name"] == "extrato.pdf"
@@ -0,0 +1,47 @@
+# tests/test_internal_parser.py
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from lib.parsers.internal_parser import _merge_multiline, _to_date_obj, _to_decimal
+
+
+@pytest.mark.parametrize("date_str, expected", [
+    ("05/11/2024", datetime(2024, 11, 5)),
+    (" 31/12/2023\n", datetime(2023, 12, 31)),
+])
+def test_to_date_obj_parses_ddmmyyyy(date_str, expected):
+    assert _to_date_obj(date_str) == expected
+
+
+@pytest.mark.parametrize("date_str", [None, "", "31/02/2024", "2024-11-05", "05/11", "aa/bb/cccc"])
+def test_to_date_obj_invalid_is_none(date_str):
+    assert _to_date_obj(date_str) is None
+
+
+@pytest.mark.parametrize("val_str, expected", [
+    ("1.234,56", Decimal("1234.56")),
+    ("0,00", Decimal("0.00")),
+    (" 12,30 ", Decimal("12.30")),
+    ("1.000.000,01", Decimal("1000000.01")),
+])
+def test_to_decimal_parses_brl(val_str, expected):
+    assert _to_decimal(val_str) == expected
+
+
+@pytest.mark.parametrize("val_str", [None, "", "   ", "R$ abc"])
+def test_to_decimal_invalid_is_none(val_str):
+    assert _to_decimal(val_str) is None
+
+
+def test_merge_multiline_joins_parts_and_skips_empty():
+    row = ["1", "Cliente", "05/11/2024", "Servi", "Obs", "100,00"]
+    merged = _merge_multiline(row, {1: ["Cliente", "", "Ltda"], 3: ["Servi", "ços"]})
+    assert merged == ["1", "Cliente Ltda", "05/11/2024", "Servi ços", "Obs", "100,00"]
+    assert row[1] == "Cliente" # o buffer original não é alterado
+
+
+def test_merge_multiline_without_parts_keeps_row():
+    row = ["1", None, "x"]
+    assert _merge_multiline(row, {}) == row
@@ -0,0 +1,74 @@
+# tests/test_page_pool.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lib.parsers import page_pool
+from lib.parsers.page_pool import iter_pages, page_ranges
+
+
+class _FakePdf:
+    def __init__(self, n_pages):
+        self.pages = [object()] * n_pages
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _pages_fn(pdf_path, start, stop, source_file_name):
+    return [{"page": i, "source": source_file_name} for i in range(start, stop)]
+
+
+@pytest.fixture
+def fake_pdf(monkeypatch):
+    monkeypatch.setattr(page_pool.pdfplumber, "open", lambda path: _FakePdf(10))
+    monkeypatch.setattr(page_pool.os, "cpu_count", lambda: 4)
+
+
+def test_page_ranges_cover_every_page_once():
+    assert page_ranges(10, 4) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+    assert page_ranges(2, 8) == [(0, 1), (1, 2)]
+    assert page_ranges(5, 1) == [(0, 5)]
+    assert page_ranges(0, 4) == []
+
+
+def test_iter_pages_without_executor_runs_inline(fake_pdf):
+    rows = list(iter_pages(_pages_fn, "x.pdf", "x.pdf"))
+    assert [r["page"] for r in rows] == list(range(10))
+
+
+def test_iter_pages_keeps_pdf_order_with_executor(fake_pdf):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        rows = list(iter_pages(_pages_fn, "x.pdf", "x.pdf", executor))
+    assert [r["page"] for r in rows] == list(range(10))
+
+
+def test_abandoned_iterator_cancels_pending_blocks(fake_pdf):
+    release = threading.Event()
+
+    def blocking_pages_fn(pdf_path, start, stop, source_file_name):
+        if start > 0:
+            release.wait(timeout=5) # segura o único worker no 2º bloco
+        return _pages_fn(pdf_path, start, stop, source_file_name)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        submitted = []
+        original_submit = executor.submit
+
+        def tracking_submit(*args, **kwargs):
+            future = original_submit(*args, **kwargs)
+            submitted.append(future)
+            return future
+
+        executor.submit = tracking_submit # type: ignore
+        rows = iter_pages(blocking_pages_fn, "x.pdf", "x.pdf", executor)
+        next(rows)
+        rows.close()
+        release.set()
+
+    assert len(submitted) == 4
+    assert [f.cancelled() for f in submitted[2:]] == [True, True]
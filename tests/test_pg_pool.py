@@ -0,0 +1,31 @@
+# tests/test_pg_pool.py
+import pytest
+
+pytest.importorskip("asyncpg")
+
+from lib.pg_pool import asyncpg_connect_args
+
+
+def test_plain_url_is_unchanged():
+    url = "postgresql://user:pw@db.example.com:5432/app?sslmode=require"
+    assert asyncpg_connect_args(url) == (url, {})
+
+
+def test_prisma_only_params_are_stripped():
+    dsn, kwargs = asyncpg_connect_args(
+        "postgresql://user:pw@db:5432/app?connection_limit=5&sslmode=require&pool_timeout=10"
+    )
+    assert dsn == "postgresql://user:pw@db:5432/app?sslmode=require"
+    assert kwargs == {}
+
+
+def test_schema_becomes_search_path():
+    dsn, kwargs = asyncpg_connect_args("postgresql://user:pw@db/app?schema=finance")
+    assert dsn == "postgresql://user:pw@db/app"
+    assert kwargs == {"server_settings": {"search_path": "finance"}}
+
+
+def test_pgbouncer_disables_the_statement_cache():
+    dsn, kwargs = asyncpg_connect_args("postgresql://user:pw@pooler:6543/app?pgbouncer=true&schema=public")
+    assert dsn == "postgresql://user:pw@pooler:6543/app"
+    assert kwargs == {"statement_cache_size": 0, "server_settings": {"search_path": "public"}}
@@ -0,0 +1,45 @@
+# tests/test_uploads.py
+import asyncio
+import glob
+import os
+import uuid
+
+import pytest
+
+pytest.importorskip("aiofiles")
+pytest.importorskip("fastapi")
+
+from lib.uploads import save_upload_to_tmp
+
+
+class _FakeUpload:
+    """Só o que save_upload_to_tmp usa de um UploadFile: filename e read()."""
+
+    def __init__(self, chunks, fail_after=None):
+        self.filename = f"-{uuid.uuid4().hex}.pdf"
+        self._chunks = list(chunks)
+        self._fail_after = fail_after
+        self._reads = 0
+
+    async def read(self, size):
+        if self._fail_after is not None and self._reads >= self._fail_after:
+            raise ConnectionResetError("upload interrompido")
+        self._reads += 1
+        return self._chunks.pop(0) if self._chunks else b""
+
+
+def test_upload_is_written_to_tmp():
+    upload = _FakeUpload([b"%PDF-", b"1.7"])
+    path = asyncio.run(save_upload_to_tmp(upload))
+    try:
+        with open(path, "rb") as f:
+            assert f.read() == b"%PDF-1.7"
+    finally:
+        os.remove(path)
+
+
+def test_failed_copy_removes_the_partial_file():
+    upload = _FakeUpload([b"%PDF-", b"1.7"], fail_after=1)
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(save_upload_to_tmp(upload))
+    assert glob.glob(f"/tmp/*{upload.filename}") == []